@@ -3,6 +3,14 @@ import sys
 from mcp.client.stdio import stdio_client, StdioServerParameters
 from mcp import ClientSession
 
+# Use uvloop's libuv-based event loop when it is installed (Linux/macOS); otherwise stdlib asyncio
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
+
 async def test_auth():
     server_params = StdioServerParameters(
         command="uv",
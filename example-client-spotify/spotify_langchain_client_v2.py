@@ -4,28 +4,58 @@ Demonstrates automatic tool discovery and model-agnostic design
 """
 
 import asyncio
+import functools
+import hashlib
+import logging
 import os
+import re
+import uuid
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Literal
+from typing import Annotated, Any, Literal
 from dotenv import load_dotenv
 import json
-from langchain.agents import create_agent
-from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import HumanMessage
 from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import StructuredTool
-from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import create_react_agent
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
-from pydantic import BaseModel, create_model, Field, field_validator, SecretStr
+from pydantic import BaseModel, create_model, Field, field_validator, SecretStr, StringConstraints
 
 
 
 # Load environment variables
 load_dotenv()
 
+# Tool-call tracing goes through logging so nothing is formatted unless DEBUG is enabled
+logger = logging.getLogger(__name__)
+
+# Use uvloop's libuv-based event loop when it is installed (Linux/macOS); otherwise stdlib asyncio
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
+def _env_positive_int(name: str, default: int) -> int:
+    """Read a positive integer from the environment, falling back to `default` if unset or invalid"""
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        value = 0
+    if value < 1:
+        logger.warning("Ignoring invalid %s=%r, using %d", name, raw, default)
+        return default
+    return value
+
+
+# Max number of MCP tool calls in flight at once (keeps Spotify from rate-limiting bursts)
+TOOL_CONCURRENCY_LIMIT = _env_positive_int("TOOL_CONCURRENCY_LIMIT", 4)
+
 
 
 # ============================================================================
@@ -44,19 +74,34 @@ class LLMProvider(Enum):
 # PYDANTIC MODELS: Validate external data (configs, MCP responses, etc.)
 # ============================================================================    
 
+# Non-blank string check that runs inside pydantic-core instead of a Python field_validator
+NonBlankStr = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+
+# Compiled once; matching runs in C without building intermediate strings
+_TOOL_NAME_RE = re.compile(r'[A-Za-z0-9_-]+').fullmatch
+
+
+# Paths already seen to exist. Only hits are remembered, so a directory that is created
+# after a failed check is picked up on the next one.
+_EXISTING_PATHS: set[str] = set()
+
+
+def _path_ok(path: str) -> bool:
+    """Cached existence check, so re-creating a config (e.g. on reconnect) skips the stat call"""
+    if path in _EXISTING_PATHS:
+        return True
+    if os.path.exists(path):
+        _EXISTING_PATHS.add(path)
+        return True
+    return False
+
+
 class LLMConfig(BaseModel):
     """Configuration for LLM - validates settings from environment/config files"""
     provider: LLMProvider
     model_name: str | None = None
     temperature: float = Field(default=0, ge=0, le=2, description="Temperature must be between 0 and 2")
-    api_key: str = Field(min_length=1, description="API key must not be empty")
-    
-    @field_validator('api_key')
-    @classmethod
-    def validate_api_key(cls, v: str) -> str:
-        if not v or v.strip() == "":
-            raise ValueError("API key cannot be empty or whitespace")
-        return v
+    api_key: NonBlankStr = Field(description="API key must not be empty")
     
     
 class MCPServerConfig(BaseModel):
@@ -67,7 +112,7 @@ class MCPServerConfig(BaseModel):
     @field_validator('server_path')
     @classmethod
     def validate_server_path(cls, v: str) -> str:
-        if not os.path.exists(v):
+        if not _path_ok(v):
             raise ValueError(f"Server path does not exist: {v}")
         return v
     
@@ -81,52 +126,33 @@ class MCPToolSchema(BaseModel):
     @field_validator('name')
     @classmethod
     def validate_tool_name(cls, v: str) -> str:
-        if not v.replace('_', '').replace('-', '').isalnum():
+        if not _TOOL_NAME_RE(v):
             raise ValueError(f"Tool name must be alphanumeric with underscores/hyphens: {v}")
         return v
     
 
 class MCPToolCall(BaseModel):
     """Request to call an MCP tool - validates arguments before sending to MCP"""
-    tool_name: str
+    tool_name: NonBlankStr
     arguments: dict[str, Any] = Field(default_factory=dict)
     
-    @field_validator('tool_name')
-    @classmethod
-    def validate_tool_name(cls, v: str) -> str:
-        if not v or v.strip() == "":
-            raise ValueError("Tool name cannot be empty")
-        return v
-    
 
-class MCPToolResponse(BaseModel):
-    """Response from MCP tool - validates data coming back from MCP"""
+@dataclass(slots=True)
+class MCPToolResponse:
+    """
+    Response from MCP tool - passed from call_mcp_tool back to the tool wrapper
+    
+    Built on every tool call from values this module already extracted, so it is a plain
+    slotted dataclass rather than a Pydantic model (no per-instance validation cost).
+    """
     success: bool = True
     content: str | None = None
     error: str | None = None
     
-    @field_validator('content', 'error')
-    @classmethod
-    def validate_content_or_error(cls, v: str | None, info) -> str | None:
-        # Ensure we have either content or error, not both
-        values = info.data
-        if values.get('success') and not v and info.field_name == 'content':
-            raise ValueError("Successful response must have content")
-        if not values.get('success') and not v and info.field_name == 'error':
-            raise ValueError("Failed response must have error message")
-        return v
-    
     
 class AgentQuery(BaseModel):
     """User query to the agent - validates input"""
-    query: str = Field(min_length=1, max_length=5000, description="User's question")
-    
-    @field_validator('query')
-    @classmethod
-    def validate_query(cls, v: str) -> str:
-        if not v or v.strip() == "":
-            raise ValueError("Query cannot be empty or whitespace")
-        return v.strip()
+    query: NonBlankStr = Field(max_length=5000, description="User's question")
     
 
 # ============================================================================
@@ -175,6 +201,9 @@ TOOL_SCHEMAS = {
     "SpotifyQueue": SpotifyQueueArgs,
 }
 
+# Tools this client can register; anything else the server advertises is skipped up front
+_SUPPORTED_NAMES = frozenset(TOOL_SCHEMAS)
+
 
 # ============================================================================
 # HELPER FUNCTIONS
@@ -184,94 +213,151 @@ def get_llm(config: LLMConfig):
     """
     Get LLM instance based on validated config (model-agnostic)
     
+    Instances are cached, so repeated calls with the same settings reuse one client
+    instead of rebuilding it.
+    
     Args:
         config: Validated LLM configuration with provider, model, etc.
     """
+    return _build_llm(config.provider, config.model_name, config.temperature, config.api_key)
+
+
+@functools.lru_cache(maxsize=8)
+def _build_llm(provider: LLMProvider, model_name: str | None, temperature: float, api_key: str):
+    """
+    Construct the provider's chat model (memoized by get_llm)
+    
+    Provider packages are imported here, so only the selected one is ever loaded.
+    """
     
-    if config.provider == LLMProvider.ANTHROPIC:
-        model_name = config.model_name or "claude-sonnet-4-5-20250929"
+    if provider == LLMProvider.ANTHROPIC:
+        from langchain_anthropic import ChatAnthropic
+        
+        model_name = model_name or "claude-sonnet-4-5-20250929"
         return ChatAnthropic(
             model_name=model_name,
-            temperature=config.temperature,
-            api_key=SecretStr(config.api_key),
+            temperature=temperature,
+            api_key=SecretStr(api_key),
             timeout=None,  # Add the "missing" optional params
             stop=None
         )
-    elif config.provider == LLMProvider.OPENAI:
-        model_name = config.model_name or "gpt-5-2025-08-07"
+    elif provider == LLMProvider.OPENAI:
+        from langchain_openai import ChatOpenAI
+        
+        model_name = model_name or "gpt-5-2025-08-07"
         return ChatOpenAI(
             model=model_name,
-            temperature=config.temperature,
-            api_key=SecretStr(config.api_key),
+            temperature=temperature,
+            api_key=SecretStr(api_key),
         )
     else:
-        raise ValueError(f"Unsupported provider: {config.provider}")
+        raise ValueError(f"Unsupported provider: {provider}")
+
+
+def llm_config_key(config: LLMConfig) -> tuple[LLMProvider, str | None, float, str]:
+    """Hashable cache key for an LLM config (the API key is stored only as a digest)"""
+    api_key_hash = hashlib.sha256(config.api_key.encode()).hexdigest()
+    return config.provider, config.model_name, config.temperature, api_key_hash
     
     
 async def call_mcp_tool(
     tool_call: MCPToolCall,
-    server_params: StdioServerParameters
+    session: ClientSession
 ) -> MCPToolResponse:
     """
     Call MCP tool with Pydantic validation on input and output
     
     Args:
         tool_call: Validated tool call request
-        server_params: Server connection parameters
+        session: Open, initialized session shared for the lifetime of the agent
         
     Returns:
         Validated tool response
     """
     try:
-        # Connect to MCP Server
-        async with stdio_client(server_params) as (r, w):
-            async with ClientSession(r, w) as session:
-                await session.initialize()
-                
-                # Make the tool call
-                result = await session.call_tool(
-                    tool_call.tool_name,
-                    arguments=tool_call.arguments
-                    )
-               
-                # Extract and validate response from tool call
-                if result and result.content:
-                    content = str(result.content[0])
-                    # print(f"running call_mcp_tool ... result is: {result} and result.content is: {content}")
-                    
-                    # Handle different content types
-                    if hasattr(content, "text"):
-                        # TextContent
-                        content = str(content_item.text)  # type: ignore
-                    elif hasattr(content, "data"):
-                        # ImageContent or other binary content
-                        content = f"[Binary content: {type(content).__name__}]"
-                    else:
-                        # Fallback for any other content type
-                        content = str(content)
-                    return MCPToolResponse(success=True, content=content)
-                
-                else:
-                    print(f"running call_mcp_tool ... no content returned from tool call")
-                    return MCPToolResponse(success=False, error="No content in response")
-                    
+        # Make the tool call over the already-connected session
+        result = await session.call_tool(
+            tool_call.tool_name,
+            arguments=tool_call.arguments
+            )
+       
+        # Extract and validate response from tool call
+        if result and result.content:
+            content_item = result.content[0]
+            logger.debug("call_mcp_tool: %s returned %s", tool_call.tool_name, content_item)
+            
+            # Handle different content types
+            if hasattr(content_item, "text"):
+                # TextContent
+                content = content_item.text
+            elif hasattr(content_item, "data"):
+                # ImageContent or other binary content
+                content = f"[Binary content: {type(content_item).__name__}]"
+            else:
+                # Fallback for any other content type
+                content = str(content_item)
+            return MCPToolResponse(success=True, content=content)
+        
+        else:
+            logger.debug("call_mcp_tool: %s returned no content", tool_call.tool_name)
+            return MCPToolResponse(success=False, error="No content in response")
+            
     except Exception as e:
         # Return validated error response
-        print(f"running call_mcp_tool ... try-except failed")
+        logger.debug("call_mcp_tool: %s failed", tool_call.tool_name, exc_info=True)
         return MCPToolResponse(success=False, error=str(e))
     
 
+class ToolCallLimiter:
+    """
+    Caps the number of MCP tool calls in flight at TOOL_CONCURRENCY_LIMIT
+    
+    The agent's tool node already runs every tool call from one AI message step
+    concurrently; every call goes through this shared semaphore, so such a step becomes
+    a bounded burst against the Spotify API instead of an unbounded one.
+    """
+    
+    def __init__(self, session: ClientSession, limit: int = TOOL_CONCURRENCY_LIMIT):
+        self.session = session
+        self._semaphore = asyncio.Semaphore(max(limit, 1))
+        
+    async def call(self, tool_call: MCPToolCall) -> MCPToolResponse:
+        """Run a single tool call once a concurrency slot is free"""
+        async with self._semaphore:
+            return await call_mcp_tool(tool_call, self.session)
+    
+
+# Limiter for the currently open MCP session. Tool wrappers look it up on every call,
+# so cached tools and agents keep working after a reconnect.
+_active_limiter: ToolCallLimiter | None = None
+
+# LangChain tools by (server path, MCP tool name), and agents by (server path, LLM config key)
+_TOOL_CACHE: dict[tuple[str, str], StructuredTool] = {}
+_AGENT_CACHE: dict[tuple[str, tuple], Any] = {}
+
+
+def _set_active_limiter(limiter: ToolCallLimiter | None) -> None:
+    global _active_limiter
+    _active_limiter = limiter
+
+
 async def discover_mcp_tools(
-    server_config: MCPServerConfig
-) -> tuple[list[StructuredTool], StdioServerParameters]:
+    server_config: MCPServerConfig,
+    stack: AsyncExitStack
+) -> tuple[list[StructuredTool], ClientSession]:
     """
     Connect to MCP server and automatically discover available tools with validation
     
+    The connection is registered on `stack` and stays open until the caller closes it,
+    so every tool call reuses one server process and one initialized session instead
+    of spawning and handshaking per call.
+    
     Args:
         server_config: Validated server configuration
+        stack: Exit stack that owns the connection for the lifetime of the agent
         
     Returns:
-        Tuple of (validated tools, server parameters)
+        Tuple of (validated tools, shared MCP session)
     """
     print(f"\n🔍 Connecting to MCP server: {server_config.server_path}")
     
@@ -279,105 +365,135 @@ async def discover_mcp_tools(
     server_params = StdioServerParameters(
         command=server_config.command,
         args=["--directory", server_config.server_path, "run", "spotify-mcp"],
-        env={k: v for k, v in os.environ.copy().items() if k != 'VIRTUAL_ENV'}  # Filter out VIRTUAL_ENV
+        env={k: v for k, v in os.environ.items() if k != 'VIRTUAL_ENV'}  # Filter out VIRTUAL_ENV
     )
     
-    # Connect to the MCP server
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
-            print("✅ Connected to MCP server")
-            
-            # AUTOMATIC DISCOVERY with validation
-            print("\n🔍 Discovering available tools...")
-            mcp_tools_response = await session.list_tools()
-            
-            print(f"✅ Discovered {len(mcp_tools_response.tools)} tools:\n")
-            
-            # Convert and validate MCP tools
-            langchain_tools = []
-            
-            for mcp_tool in mcp_tools_response.tools:
-                # Validate tool schema with Pydantic
-                try:
-                    validated_tool = MCPToolSchema(
-                        name=mcp_tool.name,
-                        description=mcp_tool.description,
-                        input_schema=mcp_tool.inputSchema or {}
-                    )
-                    
-                    print(f"  📦 {validated_tool.name}")
-                    print(f"     Description: {validated_tool.description}")
-                    print(f"     Parameters: {list(validated_tool.input_schema.get('properties', {}).keys())}\n")
-                         
-                except Exception as e:
-                    print(f"  ❌ Skipping invalid tool: {mcp_tool.name} - {e}\n")
-                    continue
+    # Connect to the MCP server (kept open by the caller's exit stack)
+    read, write = await stack.enter_async_context(stdio_client(server_params))
+    session = await stack.enter_async_context(ClientSession(read, write))
+    await session.initialize()
+    print("✅ Connected to MCP server")
     
-                # Get pre-defined schema for this tool
-                args_schema = TOOL_SCHEMAS.get(validated_tool.name)
-                
-                if not args_schema:
-                    print(f"     ⚠️  No pre-defined schema for {validated_tool.name}, skipping...\n")
-                    continue
-    
-                # Create wrapper function with validation  
-                def make_tool_function(tool_name: str, params: StdioServerParameters):
-                    async def call_tool_wrapper(**kwargs: Any) -> str:
-                        """Wrapper that validates input/output"""
-                        print(f"[DEBUG] Tool: {tool_name}, Args: {kwargs}")
-                        
-                        tool_call = MCPToolCall(
-                            tool_name=tool_name,
-                            arguments=kwargs  # Already properly typed by Pydantic schema!
-                        )
-                        
-                        response = await call_mcp_tool(tool_call, params)
-                        
-                        if response.success:
-                            return response.content or "No content"
-                        else:
-                            return f"Error: {response.error}"
-                    
-                    return call_tool_wrapper
+    # AUTOMATIC DISCOVERY with validation
+    print("\n🔍 Discovering available tools...")
+    mcp_tools_response = await session.list_tools()
+    
+    print(f"✅ Discovered {len(mcp_tools_response.tools)} tools:\n")
+    
+    # Convert and validate MCP tools
+    langchain_tools = []
+    _set_active_limiter(ToolCallLimiter(session))
+    stack.callback(_set_active_limiter, None)
+    
+    for mcp_tool in mcp_tools_response.tools:
+        # Skip tools without a pre-defined schema before building anything for them
+        if mcp_tool.name not in _SUPPORTED_NAMES:
+            print(f"  ⚠️  No pre-defined schema for {mcp_tool.name}, skipping...\n")
+            continue
+        
+        # The MCP server is a trusted, local source, so build the schema without running
+        # Pydantic validation. The name was already checked: every TOOL_SCHEMAS key is a
+        # valid tool identifier.
+        validated_tool = MCPToolSchema.model_construct(
+            name=mcp_tool.name,
+            description=mcp_tool.description,
+            input_schema=mcp_tool.inputSchema or {}
+        )
+        
+        print(f"  📦 {validated_tool.name}")
+        print(f"     Description: {validated_tool.description}")
+        print(f"     Parameters: {list(validated_tool.input_schema.get('properties', {}).keys())}\n")
+
+        # Get pre-defined schema for this tool
+        args_schema = TOOL_SCHEMAS[validated_tool.name]
+
+        # Create wrapper function with validation  
+        def make_tool_function(tool_name: str):
+            async def call_tool_wrapper(**kwargs: Any) -> str:
+                """Wrapper that validates input/output"""
+                logger.debug("Tool: %s, Args: %s", tool_name, kwargs)
                 
-                # Create LangChain tool with pre-defined schema
-                langchain_tool = StructuredTool.from_function(
-                    coroutine=make_tool_function(validated_tool.name, server_params),
-                    name=validated_tool.name,
-                    description=validated_tool.description or f"Tool: {validated_tool.name}",
-                    args_schema=args_schema,  # Use our pre-defined schema
+                # Skip re-validation: tool_name came from discovery and kwargs were
+                # already validated by the tool's args_schema before this wrapper runs
+                tool_call = MCPToolCall.model_construct(
+                    tool_name=tool_name,
+                    arguments=kwargs  # Already properly typed by Pydantic schema!
                 )
                 
-                langchain_tools.append(langchain_tool)
+                limiter = _active_limiter
+                if limiter is None:
+                    return "Error: MCP server is not connected"
+                
+                response = await limiter.call(tool_call)
+                
+                if response.success:
+                    return response.content or "No content"
+                else:
+                    return f"Error: {response.error}"
             
-            return langchain_tools, server_params
+            return call_tool_wrapper
+        
+        # Create LangChain tool with pre-defined schema (once per server and tool name)
+        tool_key = (server_config.server_path, validated_tool.name)
+        langchain_tool = _TOOL_CACHE.get(tool_key)
+        if langchain_tool is None:
+            langchain_tool = StructuredTool.from_function(
+                coroutine=make_tool_function(validated_tool.name),
+                name=validated_tool.name,
+                description=validated_tool.description or f"Tool: {validated_tool.name}",
+                args_schema=args_schema,  # Use our pre-defined schema
+            )
+            _TOOL_CACHE[tool_key] = langchain_tool
+        
+        langchain_tools.append(langchain_tool)
+    
+    return langchain_tools, session
 
 
 
 async def run_agent_query(
     agent,
     query: AgentQuery,
-    tools: list[StructuredTool]
+    config: RunnableConfig | None = None
 ) -> str:
     """
-    Run a validated query through the agent
+    Run a validated query through the agent, printing the answer as the LLM streams it
+    (or all at once, for models that don't stream)
     
     Args:
         agent: The LangChain agent
         query: Validated user query
-        tools: Available tools
+        config: Runnable config (pass the same thread_id to keep conversation memory)
+        
+    Returns:
+        The text of the final model turn (the answer)
     """
-    # Invoke the agent
-    result = await agent.ainvoke({
-        "messages": [HumanMessage(content=query.query)]
-    })
+    chunks: list[str] = []
+    async for event in agent.astream_events(
+        {"messages": [HumanMessage(content=query.query)]},
+        config=config,
+        version="v2"
+    ):
+        if event["event"] == "on_chat_model_start":
+            # A new model turn: earlier turns were only preambles to tool calls, so start
+            # the answer afresh on its own line
+            if chunks:
+                print()
+                chunks = []
+        elif event["event"] == "on_chat_model_stream":
+            text = event["data"]["chunk"].text
+            if text:
+                print(text, end="", flush=True)
+                chunks.append(text)
+        elif event["event"] == "on_chat_model_end" and not chunks:
+            # Models that don't stream send no chunks, only the finished message
+            text = event["data"]["output"].text
+            if text:
+                print(text, end="", flush=True)
+                chunks.append(text)
+    print()
     
-    # Extract the final response
-    messages = result.get("messages", [])
-    if messages:
-        return messages[-1].content
-    return "No response"
+    return "".join(chunks) or "No response"
 
 
 async def main():
@@ -389,6 +505,10 @@ async def main():
     print("With Enum + Pydantic Validation")
     print("=" * 60)
     
+    # Deferred so importing this module (or only using get_llm) doesn't load the agent stack
+    from langchain.agents import create_agent
+    from langgraph.checkpoint.memory import MemorySaver
+    
     try:
         # STEP 1: Validate MCP Server Configuration
         print("\n📋 Validating MCP server configuration...")
@@ -398,10 +518,7 @@ async def main():
         )
         print("✅ Server configuration valid")
         
-        # STEP 2: Automatically discover and validate tools
-        tools, server_params = await discover_mcp_tools(server_config)
-        
-        # STEP 3: Validate LLM Configuration
+        # STEP 2: Validate LLM Configuration
         print("\n📋 Validating LLM configuration...")
         llm_config = LLMConfig(
             provider=LLMProvider.ANTHROPIC,
@@ -411,63 +528,79 @@ async def main():
         )
         print("✅ LLM configuration valid")
         
-        # STEP 4: Create agent with validated config
-        print(f"\n🤖 Creating agent with {llm_config.provider.value}...")
-        llm = get_llm(llm_config)
+        # The MCP connection lives on this stack and is closed after the last query
+        async with AsyncExitStack() as stack:
+            # STEP 3: Automatically discover and validate tools. The LLM client constructors
+            # are synchronous, so build the client in a worker thread meanwhile; discovery
+            # itself stays in this task because its connection is owned by `stack`.
+            llm_task = asyncio.create_task(asyncio.to_thread(get_llm, llm_config))
+            try:
+                tools, session = await discover_mcp_tools(server_config, stack)
+            except BaseException:
+                # Discovery failed: still collect the LLM task so its outcome is not left
+                # unobserved, then report the discovery error
+                await asyncio.gather(llm_task, return_exceptions=True)
+                raise
+            llm = await llm_task
         
-        # Create memory saver for conversation persistence
-        memory = MemorySaver()
-        agent = create_agent(
-            llm, 
-            tools,
-            checkpointer=memory
-            )
-        print("✅ Agent created successfully with memory")
+            # STEP 4: Create agent with validated config
+            print(f"\n🤖 Creating agent with {llm_config.provider.value}...")
+            agent_key = (server_config.server_path, llm_config_key(llm_config))
+            agent = _AGENT_CACHE.get(agent_key)
+            if agent is None:
+                # Create memory saver for conversation persistence
+                memory = MemorySaver()
+                agent = create_agent(
+                    llm, 
+                    tools,
+                    checkpointer=memory
+                    )
+                _AGENT_CACHE[agent_key] = agent
+                print("✅ Agent created successfully with memory")
+            else:
+                print("✅ Reusing cached agent")
         
-        # STEP 5: Interactive chat loop
-        print("\n" + "=" * 60)
-        print("INTERACTIVE CHAT MODE")
-        print("Type 'quit', 'exit', or 'q' to end the conversation")
-        print("The agent remembers context from previous messages")
-        print("=" * 60)
+            # STEP 5: Interactive chat loop
+            print("\n" + "=" * 60)
+            print("INTERACTIVE CHAT MODE")
+            print("Type 'quit', 'exit', or 'q' to end the conversation")
+            print("The agent remembers context from previous messages")
+            print("=" * 60)
         
-        config: RunnableConfig = {"configurable": {"thread_id": "spotify_conversation_1"}}
+            # Configuration for the conversation thread. The agent and its memory may be cached from
+            # an earlier run, so each run starts its own thread rather than replaying the old one.
+            config: RunnableConfig = {"configurable": {"thread_id": f"spotify_conversation_{uuid.uuid4().hex}"}}
         
-        while True:
-            # Get user input
-            print("\n" + "-" * 60)
-            user_input = input("🗣️  YOU: ").strip()
+            while True:
+                # Get user input
+                print("\n" + "-" * 60)
+                user_input = input("🗣️  YOU: ").strip()
             
-            # Check for exit commands
-            if user_input.lower() in ['quit', 'exit', 'q', '']:
-                print("\n👋 Goodbye!")
-                break
+                # Check for exit commands
+                if user_input.lower() in ['quit', 'exit', 'q', '']:
+                    print("\n👋 Goodbye!")
+                    break
             
-            try:
-                # Validate query
-                validated_query = AgentQuery(query=user_input)
-                
-                # Invoke agent with memory
-                print("\n🤔 Agent is thinking...")
-                result = await agent.ainvoke(
-                    {"messages": [HumanMessage(content=validated_query.query)]},
-                    config=config  # Same thread = memory persists
-                )
+                try:
+                    # Validate query
+                    validated_query = AgentQuery(query=user_input)
                 
-                # Extract and display response
-                messages = result.get("messages", [])
-                if messages:
-                    for msg in reversed(messages):
-                        if hasattr(msg, 'content') and msg.content:
-                            print(f"\n🤖 AGENT: {msg.content}")
-                            break
+                    # Invoke agent with memory
+                    print("\n🤔 Agent is thinking...")
+                    # Display the response as it streams in
+                    print("\n🤖 AGENT: ", end="", flush=True)
+                    await run_agent_query(
+                        agent,
+                        validated_query,
+                        config=config  # Same thread = memory persists
+                    )
                 
-            except ValueError as e:
-                print(f"\n❌ Invalid input: {e}")
-            except Exception as e:
-                print(f"\n❌ Error: {e}")
-                import traceback
-                traceback.print_exc()
+                except ValueError as e:
+                    print(f"\n❌ Invalid input: {e}")
+                except Exception as e:
+                    print(f"\n❌ Error: {e}")
+                    import traceback
+                    traceback.print_exc()
         
         print("\n" + "=" * 60)
         print("CHAT SESSION ENDED")
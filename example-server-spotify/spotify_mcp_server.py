@@ -3,8 +3,17 @@ Spotify MCP Server
 Provides tools to search and get information from Spotify
 """
 
+import functools
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 from dotenv import load_dotenv
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
 from spotipy.exceptions import SpotifyException
@@ -13,12 +22,86 @@ from mcp.server.fastmcp import FastMCP
 # Load environment variables
 load_dotenv()
 
+# Shared HTTP session: one keep-alive connection pool for every Spotify call (token
+# requests included), retrying rate limits and transient server errors
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=10,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(429, 500, 502, 503, 504))
+))
+
 # Initialize Spotify client
 client_credentials_manager = SpotifyClientCredentials(
     client_id=os.getenv("SPOTIFY_CLIENT_ID"),
-    client_secret=os.getenv("SPOTIFY_CLIENT_SECRET")
+    client_secret=os.getenv("SPOTIFY_CLIENT_SECRET"),
+    requests_session=http_session
 )
-sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
+sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager, requests_session=http_session)
+
+# Worker threads for independent Spotify requests made within a single tool call
+spotify_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="spotify")
+
+
+def ttl_cache(maxsize: int = 1024, ttl: float = 300):
+    """
+    LRU cache whose entries expire after `ttl` seconds
+    
+    Used for read-only Spotify lookups that agents repeat within a conversation. Only
+    successful results are stored; exceptions propagate and are never cached.
+    """
+    def decorator(func):
+        entries: OrderedDict = OrderedDict()
+        lock = threading.Lock()
+        
+        @functools.wraps(func)
+        def wrapper(*args):
+            now = time.monotonic()
+            with lock:
+                hit = entries.get(args)
+                if hit is not None and hit[0] > now:
+                    entries.move_to_end(args)
+                    return hit[1]
+            
+            value = func(*args)
+            with lock:
+                entries[args] = (now + ttl, value)
+                entries.move_to_end(args)
+                if len(entries) > maxsize:
+                    entries.popitem(last=False)
+            return value
+        
+        return wrapper
+    return decorator
+
+
+# Cached Spotify lookups (artist metadata, audio features and search results change rarely)
+@ttl_cache()
+def _search(query: str, search_type: str, limit: int):
+    return sp.search(q=query, type=search_type, limit=limit)
+
+@ttl_cache()
+def _artist(artist_id: str):
+    return sp.artist(artist_id)
+
+@ttl_cache()
+def _artist_top_tracks(artist_id: str):
+    return sp.artist_top_tracks(artist_id)
+
+@ttl_cache()
+def _audio_features(track_id: str):
+    return sp.audio_features(track_id)
+
+@ttl_cache()
+def _track(track_id: str):
+    return sp.track(track_id)
+
+
+# Field extractors for the per-track list renderers: pull all scalar fields of a track in
+# one C-level call. The f-string templates they feed are compiled once with the module.
+_search_track_fields = itemgetter('name', 'id', 'uri', 'album', 'artists')
+_recommended_track_fields = itemgetter('name', 'id', 'popularity', 'album', 'artists')
+
 
 # Create MCP server
 mcp = FastMCP("Spotify")
@@ -33,31 +116,24 @@ def search_tracks(query: str, limit: int = 10) -> str:
         limit: Maximum number of results (default: 10, max: 50)
     """
     try:
-        results = sp.search(q=query, type='track', limit=min(limit, 50))
+        results = _search(query, 'track', min(limit, 50))
         if not results or not results.get("tracks") or not results["tracks"]["items"]:
             return f"No results found for track name: '{query}'"
         
-        tracks = []
-        for item in results['tracks']['items']:
-            track_info = {
-                'name': item['name'],
-                'artist': ', '.join([artist['name'] for artist in item['artists']]),
-                'album': item['album']['name'],
-                'uri': item['uri'],
-                'id': item['id'],
-                'preview_url': item.get('preview_url', 'N/A')
-            }
-            tracks.append(track_info)
-        
-        output = f"Found {len(tracks)} tracks:\n\n"
-        for i, track in enumerate(tracks, 1):
-            output += f"{i}. {track['name']} by {track['artist']}\n"
-            output += f"   Album: {track['album']}\n"
-            output += f"   Track ID: {track['id']}\n"
-            output += f"   URI: {track['uri']}\n"
-            output += f"   Preview: {track['preview_url']}\n\n"
-        
-        return output
+        # Format straight from the API items: no intermediate per-track dicts
+        items = results['tracks']['items']
+        parts: list[str] = [f"Found {len(items)} tracks:\n\n"]
+        for i, item in enumerate(items, 1):
+            name, track_id, uri, album, artists = _search_track_fields(item)
+            parts.append(
+                f"{i}. {name} by {', '.join(artist['name'] for artist in artists)}\n"
+                f"   Album: {album['name']}\n"
+                f"   Track ID: {track_id}\n"
+                f"   URI: {uri}\n"
+                f"   Preview: {item.get('preview_url', 'N/A')}\n\n"
+            )
+        
+        return "".join(parts)
     
     except SpotifyException as e:
         return f"Spotify API error: {e.msg} (Status: {e.http_status})"
@@ -75,7 +151,7 @@ def get_artist_info(artist_name: str) -> str:
     """
     try:
         # Search for the artist
-        results = sp.search(q=artist_name, type='artist', limit=1)
+        results = _search(artist_name, 'artist', 1)
         
         if not results or not results.get('artists') or not results['artists']['items']:
             return f"No artist found with name: '{artist_name}'"
@@ -83,28 +159,32 @@ def get_artist_info(artist_name: str) -> str:
         artist = results['artists']['items'][0]
         artist_id = artist['id']
         
-        # Get detailed artist info
-        artist_details = sp.artist(artist_id)
+        # Get detailed artist info and top tracks concurrently (both only need artist_id)
+        artist_future = spotify_executor.submit(_artist, artist_id)
+        top_tracks_future = spotify_executor.submit(_artist_top_tracks, artist_id)
+        artist_details = artist_future.result()
+        top_tracks = top_tracks_future.result()
+        
         if not artist_details:
             return f"Could not retrieve details for artist: '{artist_name}'"
         
-        # Get top tracks
-        top_tracks = sp.artist_top_tracks(artist_id)    
         if not top_tracks or not top_tracks.get('tracks'):
             return f"Could not retrieve top tracks for artist: '{artist_name}'"
         
         # Format output
-        output = f"Artist: {artist_details['name']}\n"
-        output += f"Popularity: {artist_details['popularity']}/100\n"
-        output += f"Followers: {artist_details['followers']['total']:,}\n"
-        output += f"Genres: {', '.join(artist_details['genres']) if artist_details['genres'] else 'N/A'}\n"
-        output += f"Spotify URI: {artist_details['uri']}\n\n"
-        
-        output += "Top Tracks:\n"
+        genres = ', '.join(artist_details['genres']) if artist_details['genres'] else 'N/A'
+        parts: list[str] = [
+            f"Artist: {artist_details['name']}\n"
+            f"Popularity: {artist_details['popularity']}/100\n"
+            f"Followers: {artist_details['followers']['total']:,}\n"
+            f"Genres: {genres}\n"
+            f"Spotify URI: {artist_details['uri']}\n\n"
+            "Top Tracks:\n"
+        ]
         for i, track in enumerate(top_tracks['tracks'][:5], 1):
-            output += f"{i}. {track['name']} - {track['album']['name']}\n"
+            parts.append(f"{i}. {track['name']} - {track['album']['name']}\n")
         
-        return output
+        return "".join(parts)
     
     except SpotifyException as e:
         return f"Spotify API error: {e.msg} (Status: {e.http_status})"
@@ -121,37 +201,81 @@ def get_audio_features(track_id: str) -> str:
         track_id: Spotify track ID (get this from search_tracks)
     """
     try:
-        # Get audio features
-        features_response = sp.audio_features(track_id)
+        # Get audio features and basic track info concurrently (independent requests)
+        features_future = spotify_executor.submit(_audio_features, track_id)
+        track_future = spotify_executor.submit(_track, track_id)
+        features_response = features_future.result()
+        track = track_future.result()
 
         if not features_response or not features_response[0]:
             return f"No audio features found for track ID: '{track_id}'"
 
-        
-        # Get basic track info
         features = features_response[0]
-        track = sp.track(track_id)
         if not track:
             return f"Could not retrieve track information for ID: '{track_id}'"
         
-        output = f"Audio Features for: {track['name']} by {track['artists'][0]['name']}\n\n"
-        output += f"Tempo: {features['tempo']:.1f} BPM\n"
-        output += f"Key: {features['key']} (0=C, 1=C#, 2=D, etc.)\n"
-        output += f"Mode: {'Major' if features['mode'] == 1 else 'Minor'}\n"
-        output += f"Time Signature: {features['time_signature']}/4\n"
-        output += f"Duration: {features['duration_ms'] / 1000:.1f} seconds\n\n"
-        
-        output += "Musical Characteristics (0.0 to 1.0):\n"
-        output += f"  Danceability: {features['danceability']:.2f}\n"
-        output += f"  Energy: {features['energy']:.2f}\n"
-        output += f"  Speechiness: {features['speechiness']:.2f}\n"
-        output += f"  Acousticness: {features['acousticness']:.2f}\n"
-        output += f"  Instrumentalness: {features['instrumentalness']:.2f}\n"
-        output += f"  Liveness: {features['liveness']:.2f}\n"
-        output += f"  Valence (positivity): {features['valence']:.2f}\n"
-        output += f"  Loudness: {features['loudness']:.1f} dB\n"
-        
-        return output
+        # Fixed-size report, so build it as one string rather than repeated +=
+        return (
+            f"Audio Features for: {track['name']} by {track['artists'][0]['name']}\n\n"
+            f"Tempo: {features['tempo']:.1f} BPM\n"
+            f"Key: {features['key']} (0=C, 1=C#, 2=D, etc.)\n"
+            f"Mode: {'Major' if features['mode'] == 1 else 'Minor'}\n"
+            f"Time Signature: {features['time_signature']}/4\n"
+            f"Duration: {features['duration_ms'] / 1000:.1f} seconds\n\n"
+            "Musical Characteristics (0.0 to 1.0):\n"
+            f"  Danceability: {features['danceability']:.2f}\n"
+            f"  Energy: {features['energy']:.2f}\n"
+            f"  Speechiness: {features['speechiness']:.2f}\n"
+            f"  Acousticness: {features['acousticness']:.2f}\n"
+            f"  Instrumentalness: {features['instrumentalness']:.2f}\n"
+            f"  Liveness: {features['liveness']:.2f}\n"
+            f"  Valence (positivity): {features['valence']:.2f}\n"
+            f"  Loudness: {features['loudness']:.1f} dB\n"
+        )
+    
+    except SpotifyException as e:
+        return f"Spotify API error: {e.msg} (Status: {e.http_status})"
+    except Exception as e:
+        return f"Unexpected error: {str(e)}"
+
+
+@mcp.tool()
+def get_audio_features_batch(track_ids: str) -> str:
+    """
+    Get key audio features for several tracks at once (tempo, key, energy, etc.)
+    
+    Args:
+        track_ids: Comma-separated Spotify track IDs (up to 100)
+    """
+    try:
+        # Parse track IDs
+        ids = [tid.strip() for tid in track_ids.split(',') if tid.strip()][:100]
+        
+        if not ids:
+            return "Please provide at least one track ID"
+        
+        # One audio-features request covers up to 100 IDs; track names come from the
+        # tracks endpoint (50 IDs per request), all fetched concurrently
+        features_future = spotify_executor.submit(sp.audio_features, ids)
+        track_futures = [spotify_executor.submit(sp.tracks, ids[i:i + 50]) for i in range(0, len(ids), 50)]
+        features_list = features_future.result() or []
+        tracks = [track for future in track_futures for track in (future.result() or {}).get('tracks', [])]
+        
+        parts: list[str] = [f"Audio features for {len(ids)} track(s):\n\n"]
+        for i, (track_id, features, track) in enumerate(zip(ids, features_list, tracks), 1):
+            if not features or not track:
+                parts.append(f"{i}. Track ID: {track_id} - no audio features found\n\n")
+                continue
+            parts.append(
+                f"{i}. {track['name']} by {track['artists'][0]['name']}\n"
+                f"   Track ID: {track_id}\n"
+                f"   Tempo: {features['tempo']:.1f} BPM, Key: {features['key']}, "
+                f"Mode: {'Major' if features['mode'] == 1 else 'Minor'}\n"
+                f"   Danceability: {features['danceability']:.2f}, Energy: {features['energy']:.2f}, "
+                f"Valence: {features['valence']:.2f}\n\n"
+            )
+        
+        return "".join(parts)
     
     except SpotifyException as e:
         return f"Spotify API error: {e.msg} (Status: {e.http_status})"
@@ -181,15 +305,18 @@ def get_recommendations(seed_track_ids: str, limit: int = 10) -> str:
         if not results or not results['tracks']:
             return "No recommendations found for the given tracks"
         
-        output = f"Recommendations based on {len(track_ids)} seed track(s):\n\n"
+        parts: list[str] = [f"Recommendations based on {len(track_ids)} seed track(s):\n\n"]
         
         for i, track in enumerate(results['tracks'], 1):
-            output += f"{i}. {track['name']} by {', '.join([artist['name'] for artist in track['artists']])}\n"
-            output += f"   Album: {track['album']['name']}\n"
-            output += f"   Track ID: {track['id']}\n"
-            output += f"   Popularity: {track['popularity']}/100\n\n"
+            name, track_id, popularity, album, artists = _recommended_track_fields(track)
+            parts.append(
+                f"{i}. {name} by {', '.join(artist['name'] for artist in artists)}\n"
+                f"   Album: {album['name']}\n"
+                f"   Track ID: {track_id}\n"
+                f"   Popularity: {popularity}/100\n\n"
+            )
         
-        return output
+        return "".join(parts)
     
     except SpotifyException as e:
         return f"Spotify API error: {e.msg} (Status: {e.http_status})"
@@ -1,12 +1,29 @@
 """Example showing lifespan support for startup/shutdown with strong typing."""
 
-from collections.abc import AsyncIterator
-from contextlib import asynccontextmanager
-from dataclasses import dataclass
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import sys
+from contextlib import AsyncExitStack, aclosing, asynccontextmanager
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+import anyio
+from pydantic import BaseModel
 
 from mcp.server.fastmcp import Context, FastMCP
+from mcp.server.fastmcp.tools import Tool
+from mcp.server.fastmcp.utilities.func_metadata import ArgModelBase, FuncMetadata
 from mcp.server.session import ServerSession
 
+# Names used only in type annotations: with "from __future__ import annotations" those are never evaluated at runtime,
+# so these imports are only needed by type checkers and are skipped when the module is imported.
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Awaitable, Callable
+    from contextlib import AbstractAsyncContextManager
+
+    from starlette.applications import Starlette
+
 '''
 Notes re this example: 
 
@@ -16,12 +33,28 @@ Notes re this example:
             - Stays connected while the server runs
             - Disconnects cleanly when the server stops
 
+    - The DatabasePool:
+        - Instead of one shared connection, startup opens POOL_SIZE connections at once and keeps them in a free list.
+          (Because the mock Database is stateless, the pool opens a single connection and lends it to up to POOL_SIZE
+          callers at once - see Database.STATELESS.)
+        - Each tool call borrows a connection (pool.acquire()) and returns it when done, so concurrent calls run in
+          parallel instead of queuing behind a single connection, and nothing reconnects per call.
+
     - The AppContext:
-        - This is a typed container that holds your initialized resources (like the database). It ensures type-safe access throughout your code.
+        - This is a typed container that holds your initialized resources (like the database pool).
+          It ensures type-safe access throughout your code.
+
+    - Deferred startup:
+        - The lifespan hands the AppContext to the server straight away and opens the connections in a background task,
+          so the session starts serving requests (e.g. listing tools) without waiting for slow resources.
+        - AppContext.ready is set once everything is connected, and tools wait for it before touching the pool.
+        - If connecting fails, the server is stopped and the error is raised, rather than leaving tools waiting forever.
 
     Key learnings:
-        - Running the query_db Tool via the inspector uses the database connection established during startup and runs the query method of the Database class (which, in this example, just returns a string).
-        - The lifespan context is accessible in any Tool or endpoint via the Context object, ensuring type safety and easy access to shared resources.
+        - Running the query_db Tool via the inspector borrows one of the database connections established during
+          startup and runs the query method of the Database class (which, in this example, just returns a string).
+        - The lifespan context is accessible in any Tool or endpoint via the Context object, ensuring type safety and
+          easy access to shared resources.
 '''
 
 
@@ -29,100 +62,429 @@ Notes re this example:
 class Database:
     """Mock database class for example."""
 
+    # No instance attributes yet; a real connection handle would be listed here, e.g. __slots__ = ("_conn",)
+    __slots__ = ()
+
+    # The mock's result is the same for every query, so it is built once with the class rather than per call
+    RESULT = "Query result"
+
+    # A stateless connection (like this mock) can serve several callers at once, so a pool only needs to open one and
+    # can lend it out to all of its borrowers (see DatabasePool.connect). Each pool opens its own, so servers built by
+    # separate build_mcp() calls never share a connection.
+    STATELESS = True
+
+    # The mock has nothing to wait for when connecting, so the pool calls the plain connect() - no coroutine object is
+    # created or scheduled per connection. A real driver that must await its handshake sets ASYNC_CONNECT = True and
+    # does its I/O in _open(); the pool then uses connect_async() instead.
+    ASYNC_CONNECT = False
+
+    @classmethod
+    def connect(cls) -> Database:
+        """Connect to database without awaiting anything."""
+        return cls()
+
+    @classmethod
+    async def connect_async(cls) -> Database:
+        """Connect to database, awaiting the driver's I/O."""
+        return await cls._open()
+
     @classmethod
-    async def connect(cls) -> "Database":
-        """Connect to database."""
+    async def _open(cls) -> Database:
+        """Open a new connection (a real driver would do its I/O here)."""
         return cls()
 
-    async def disconnect(self) -> None:
+    async def aclose(self) -> None:
         """Disconnect from database."""
-        pass
 
-    def query(self) -> str:
-        """Execute a query."""
-        return "Query result"
+    async def query(self) -> str:
+        """Execute a query (async, so a real driver's I/O never blocks the event loop)."""
+        return self.RESULT
+
+
+# Number of connections opened at startup (= max number of concurrent queries)
+POOL_SIZE = 4
+
+
+class DatabasePool:
+    """
+    Fixed-size pool of pre-connected Database instances shared by all tool calls.
+
+    - Uses anyio primitives (the runtime FastMCP itself runs on): a list of free connections plus a semaphore counting
+      them. The semaphore starts at 0 and is released once per opened connection, so acquire() simply waits until one
+      is available - including while the pool is still connecting.
+    - The pool owns its connections: they are opened by connect() and closed by aclose(), and are never handed to
+      another pool.
+    """
+
+    __slots__ = ("size", "_conns", "_free", "_available")
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._conns: list[Database] = []
+        self._free: list[Database] = []
+        self._available = anyio.Semaphore(0, max_value=size)
+
+    async def connect(self) -> None:
+        """
+        Open all connections concurrently and put them in the pool.
+
+        - A STATELESS Database needs only one connection: it is opened once and put in the free list size times, so
+          the semaphore still caps the number of concurrent queries at size.
+        - With ASYNC_CONNECT the connects run in a task group: if one fails - or this call is cancelled (e.g. the
+          server shuts down during startup) - the others are cancelled, and the ones that did open are closed before
+          the error propagates, so no connection is leaked.
+        - That cleanup runs in a shielded cancel scope: a cancelled caller would otherwise abort it at its first await.
+        """
+        count = 1 if Database.STATELESS else self.size
+        opened: list[Database] = []
+
+        async def open_one() -> None:
+            opened.append(await Database.connect_async())
+
+        try:
+            if Database.ASYNC_CONNECT:
+                async with anyio.create_task_group() as tg:
+                    for _ in range(count):
+                        tg.start_soon(open_one)
+            else:
+                # Nothing to wait for, so there is nothing to overlap: open them one after another (extend appends
+                # each as it is opened, so a failure part-way still leaves the opened ones in the list for cleanup)
+                opened.extend(Database.connect() for _ in range(count))
+        except BaseException:
+            with anyio.CancelScope(shield=True):
+                for db in opened:
+                    await db.aclose()
+            raise
+        self._conns = opened
+        for db in opened * (self.size // count):
+            self._free.append(db)
+            self._available.release()
 
+    @asynccontextmanager
+    async def acquire(self) -> AsyncGenerator[Database, None]:
+        """Borrow a connection (waiting if all are in use); it is returned when the block exits."""
+        async with self._available:
+            db = self._free.pop()
+            try:
+                yield db
+            finally:
+                self._free.append(db)
 
-@dataclass
-class AppContext:
+    async def aclose(self) -> None:
+        """
+        Drain the pool and disconnect every connection it opened (each one once, even if it was lent out several
+        times).
+
+        - Shutdown usually happens because the server was cancelled, so the disconnects run in a shielded cancel
+          scope - otherwise they would be aborted at the first await and leave connections open.
+        """
+        conns, self._conns, self._free = self._conns, [], []
+        with anyio.CancelScope(shield=True):
+            for db in conns:
+                await db.aclose()
+
+
+class AppContext(NamedTuple):
     """
     - Application context with typed dependencies.
-    - This says: "AppContext will always contain a db attribute, and it will always be of type Database (defined above)."
+    - This says: "AppContext will always contain a pool attribute, and it will always be of type DatabasePool
+      (defined above)."
+    - ready is set once the pool's connections are open (see AppLifespan below); until then the pool is empty.
+    - It is a NamedTuple: a tuple with named fields. Building one is a single tuple allocation and each field read is
+      a C-level index, with no per-instance __dict__; like a frozen dataclass, it is read-only once the lifespan has
+      built it.
     - If we wanted to add more resources, we could just add more attributes here. 
         Example: 
-            class AppContext:
-                db: Database
+            class AppContext(NamedTuple):
+                pool: DatabasePool
+                ready: anyio.Event
                 cache: RedisCache | None = None  # Optional - defaults to None
                 config: AppConfig | None = None  # Optional - defaults to None
-        In this case, we would update the yield statement in app_lifespan to include these new attributes.
+        In this case, we would update the AppContext built in AppLifespan.__aenter__ to include these new attributes.
+        The resources do not depend on each other, so they should be started together in one task group (startup then
+        takes as long as the slowest one, not the sum of all of them), each registering its cleanup on the exit stack.
             Example:
-                yield AppContext(db=db, cache=cache, config=config)
+                async with anyio.create_task_group() as tg:
+                    tg.start_soon(pool.connect)
+                    tg.start_soon(cache.connect)
+                    tg.start_soon(config.load)
+                return AppContext(pool, ready, cache, config)
+    - fanout() is for tools that need several of those resources at once: the lookups run concurrently, so the tool
+      waits for the slowest one rather than for all of them in turn.
+            Example:
+                rows, cached = await app.fanout(db.query(), app.cache.get(key))
     """
-    db: Database
+    pool: DatabasePool
+    ready: anyio.Event
+
+    async def fanout(self, *aws: Awaitable[Any]) -> list[Any]:
+        """
+        Await independent operations concurrently and return their results in argument order.
 
+        - Runs them in a task group (anyio, so it also works on Python 3.10 where asyncio.TaskGroup does not exist): if
+          one fails, the others are cancelled and the error is raised (wrapped in an ExceptionGroup), so no task leaks.
+        """
+        results: list[Any] = [None] * len(aws)
 
-@asynccontextmanager
-async def app_lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
+        async def run(i: int, aw: Awaitable[Any]) -> None:
+            results[i] = await aw
+
+        async with anyio.create_task_group() as tg:
+            for i, aw in enumerate(aws):
+                tg.start_soon(run, i, aw)
+        return results
+
+
+class AppLifespan:
     """
     Manage application lifecycle with type-safe context.
-    
-    Key concepts: 
-        - The -> AsyncIterator[AppContext] part tells Python: "This function will yield an AppContext object."
-        - This function doesn't return - it yields. This is important because:
-            - return gives you something once and the function ends
-            - yield gives you something, pauses, waits, and then continues
-        - When we call app_lifespan, it will:
-            1. Run the code before yield (initialize resources)
-            2. Pause and give the AppContext (containing a db attribute via AppContext.db) to the server
-            3. Server runs - tools can now access the database via ctx.request_context.lifespan_context.db
-            4. When server shuts down, resume from the yield and run the finally block (cleanup - disconnect database)
-    """
-    # Initialize on startup
-    db = await Database.connect()
-    try:
-        yield AppContext(db=db)
-        # Function pauses here while server runs
-    finally:
-        # Cleanup on shutdown
-        await db.disconnect()
-
-
-# Pass lifespan to server
-"""
-Key concepts:
-    - This effectively says: 
-        "When you start the server, execute the app_lifespan function to set up resources."
-"""
-mcp = FastMCP("My App", lifespan=app_lifespan)
 
+    Key concepts:
+        - The server is given one instance (AppLifespan()) and calls it with itself - lifespan(server) - every time it
+          starts, using the result in an "async with" block.
+        - Each call returns a new AppLifespanEntry: an async context manager written as a class, which owns the cleanup
+          stack of that one run. Concurrent entries - one per streamable HTTP session, or two nested in the same task -
+          and in-process restarts (tests, reloads) therefore never share state. AppLifespan itself only holds what is
+          shared across runs: the AppContexts that are currently live.
+        - The entry's two methods split the lifecycle in two:
+            - __aenter__ runs on startup and returns the AppContext that is handed to the server
+            - __aexit__ runs on shutdown (even if the server stopped because of an error) and cleans up
+        - When the server starts, it will:
+            1. Run __aenter__ (create the resources and start connecting them in the background)
+            2. Receive the AppContext (containing a pool attribute via AppContext.pool) - immediately, before the
+               connections are open
+            3. Run - once AppContext.ready is set, tools can borrow connections via
+               ctx.request_context.lifespan_context.pool
+            4. When the server shuts down, run __aexit__ (cleanup - disconnect all connections)
+        - Compared with an @asynccontextmanager generator, there is no generator frame or wrapper object, and the
+          cleanup path for a startup that fails or is cancelled half-way is spelled out explicitly in __aenter__.
+        - Every resource is entered on an AsyncExitStack as soon as it exists. Shutdown is then a single stack.aclose(),
+          which closes resources in reverse order of startup without nested try/finally blocks.
+        - Resources follow the stdlib "aclose()" convention (like async generators and most async clients), so
+          contextlib.aclosing(resource) turns any of them into a context manager without writing __aenter__/__aexit__.
+            Example (adding a cache):
+                cache = await stack.enter_async_context(aclosing(RedisCache()))
+    """
+
+    def __init__(self) -> None:
+        # AppContexts of the entries that are currently running, oldest first. With stdio there is exactly one,
+        # so app_context() can return it without touching the request at all (see below).
+        self.live: list[AppContext] = []
+
+    def __call__(self, _server: FastMCP) -> AppLifespanEntry:
+        # FastMCP passes itself in; everything this lifespan needs is created per entry, so the server is not used
+        return AppLifespanEntry(self)
+
+    def app_context(self, ctx: Context[ServerSession, AppContext]) -> AppContext:
+        """
+        Return the AppContext for this request without walking ctx.request_context more than necessary.
+
+        - ctx.request_context is a property (it checks the request is active on every access), so tools should call
+          this once and keep the result in a local rather than reading several lifespan fields through ctx.
+        - While only one entry is running (always the case with stdio), every request shares its AppContext, so it is
+          returned directly. It is registered when the lifespan starts and removed when it stops, so a restarted server
+          never sees a stale one.
+        - Otherwise (e.g. one entry per streamable HTTP session), it is read from the request.
+        """
+        if len(self.live) == 1:
+            return self.live[0]
+        return ctx.request_context.lifespan_context
 
-# Access type-safe lifespan context in tools
+
+class AppLifespanEntry:
+    """One run of an AppLifespan: starts the resources on entry and closes them again on exit."""
+
+    __slots__ = ("_owner", "_stack")
+
+    def __init__(self, owner: AppLifespan) -> None:
+        self._owner = owner
+        self._stack = AsyncExitStack()
+
+    async def __aenter__(self) -> AppContext:
+        # Initialize on startup. If anything below fails or is cancelled, leaving this "async with" closes
+        # whatever was already registered on the stack (__aexit__ will not run in that case).
+        async with AsyncExitStack() as stack:
+            pool = await stack.enter_async_context(aclosing(DatabasePool(size=POOL_SIZE)))
+            ready = anyio.Event()
+
+            async def deferred_init() -> None:
+                await pool.connect()  # opens all pooled connections (concurrently with ASYNC_CONNECT)
+                ready.set()
+
+            # Connect in the background so the server can start accepting connections now. The task group stays open
+            # for the whole server run: if connecting fails, it cancels the server and the error is raised on exit.
+            # On shutdown the group is cancelled first (stopping a connect still in progress), then the pool is closed.
+            tg = await stack.enter_async_context(anyio.create_task_group())
+            stack.callback(tg.cancel_scope.cancel)
+            tg.start_soon(deferred_init)
+
+            app = AppContext(pool, ready)
+            live = self._owner.live
+            live.append(app)
+            stack.callback(live.remove, app)
+            # Startup succeeded: hand the registered cleanups over to __aexit__
+            self._stack = stack.pop_all()
+        return app
+
+    async def __aexit__(self, exc_type: object, exc: object, tb: object) -> None:
+        # Cleanup on shutdown (reverse order of startup): stop the background init task, then close the pool
+        await self._stack.aclose()
+
+
+def merged_lifespan(
+    mcp_app: Starlette,
+    user_lifespan: Callable[[Starlette], AbstractAsyncContextManager[None]] | None = None,
+) -> Callable[[Starlette], AbstractAsyncContextManager[None]]:
+    """
+    Build a lifespan for a parent ASGI app (Starlette/FastAPI) that mounts this server over HTTP.
+
+    - A mounted sub-app's lifespan is not run by its parent, so the parent must run it - here together with the
+      parent's own lifespan (if any), entered on one AsyncExitStack and closed in reverse order.
+        Example:
+            mcp_app = mcp.streamable_http_app()
+            app = Starlette(routes=[Mount("/", app=mcp_app)], lifespan=merged_lifespan(mcp_app))
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncGenerator[None, None]:
+        async with AsyncExitStack() as stack:
+            await stack.enter_async_context(mcp_app.router.lifespan_context(mcp_app))
+            if user_lifespan is not None:
+                await stack.enter_async_context(user_lifespan(app))
+            yield
+
+    return lifespan
+
+
+# Pre-built tool metadata for query_db
 """
 Key concepts:
-    - @mcp.tool() is a decorator that registers the function below (query_db) as a Tool in the "mcp" FastMCP server created above.
-    - Function signature comments:
-        - Context:
-            - a generic type that provides access to both the current server session and the application context (which includes our database connection).
-            - contains three type parameters:
-                1. ServerSessionT: 
-                    (1a) (in this example, ServerSessionT= ServerSession)
-                    (1b) must come first
-                    (1c) imported as part of the mcp library
-                    (1d) Access via: ctx.session
-                2. LifespanContextT
-                    (2a) (in this example, LifespanContextT= AppContext)
-                    (2b) must come second
-                    (2c) Access via: ctx.request_context.lifespan_context
-                3. RequestT (optional)
-                    (3a) (not used in this example)
-                    (3b) must come last if used
-                    (3c) Access via: ctx.request_context.request
-    - The example below basically says the following:
-        1. db = ctx.request_context.lifespan_context.db --> "Get the database object (i.e. database connection) that was created once at server startup and stored in the lifespan context."
-        2. return db.query() --> "Run the query method on that database object and return the result."
+    - @mcp.tool() works out a tool's input/output schemas at import time by inspecting the function's signature and
+      type hints. query_db's shape is fixed (no arguments besides the injected ctx, returns a str), so its metadata is
+      written out once here instead, and build_mcp() registers it as a ready-made Tool.
+    - The schemas are exactly what @mcp.tool() would generate, so clients see the same tool either way.
+    - If query_db's signature changes, these must change with it (or go back to @mcp.tool()). A test in
+      tests/server/fastmcp/test_integration.py compares them with what the SDK generates, so drift is caught.
 """
-@mcp.tool() 
-def query_db(ctx: Context[ServerSession, AppContext]) -> str:
-    """Query the database using the lifespan context."""    
-    db = ctx.request_context.lifespan_context.db
-    return db.query()
+
+
+class QueryDbArguments(ArgModelBase):
+    """query_db takes no arguments from the client (ctx is injected by FastMCP)."""
+
+
+class QueryDbOutput(BaseModel):
+    result: str
+
+
+QUERY_DB_METADATA = FuncMetadata(
+    arg_model=QueryDbArguments,
+    output_schema={
+        "properties": {"result": {"title": "Result", "type": "string"}},
+        "required": ["result"],
+        "title": "query_dbOutput",
+        "type": "object",
+    },
+    output_model=QueryDbOutput,
+    wrap_output=True,
+)
+QUERY_DB_PARAMETERS: dict[str, Any] = {"properties": {}, "title": "query_dbArguments", "type": "object"}
+
+
+def build_mcp(name: str = "My App") -> FastMCP:
+    """
+    Create the server with its own lifespan and tools.
+
+    - Everything a server needs is created inside this function, so each call returns an independent server (handy in
+      tests, or to run several servers in one process) instead of every user sharing one module-level instance.
+    """
+    lifespan = AppLifespan()
+
+    # Access type-safe lifespan context in tools
+    """
+    Key concepts:
+        - query_db is registered as a Tool on the server created below (see QUERY_DB_METADATA above for why it is not
+          decorated with @mcp.tool()).
+        - Function signature comments:
+            - Context:
+                - a generic type that provides access to both the current server session and the application context
+                  (which includes our database connection).
+                - contains three type parameters:
+                    1. ServerSessionT: 
+                        (1a) (in this example, ServerSessionT= ServerSession)
+                        (1b) must come first
+                        (1c) imported as part of the mcp library
+                        (1d) Access via: ctx.session
+                    2. LifespanContextT
+                        (2a) (in this example, LifespanContextT= AppContext)
+                        (2b) must come second
+                        (2c) Access via: ctx.request_context.lifespan_context
+                    3. RequestT (optional)
+                        (3a) (not used in this example)
+                        (3b) must come last if used
+                        (3c) Access via: ctx.request_context.request
+        - The example below basically says the following:
+            1. app = lifespan.app_context(ctx) --> "Get the AppContext that was created once at server startup."
+               (it is ctx.request_context.lifespan_context, usually without even looking it up -
+               see AppLifespan.app_context.)
+            2. await app.ready.wait() -->
+               "If the connections are still being opened in the background, wait until they are."
+            3. async with app.pool.acquire() as db -->
+               "Borrow one connection; it goes back to the pool when the block ends."
+            4. return await db.query() --> "Run the query method on that database object and return the result."
+        - query_db is async because borrowing a connection may have to wait for one to be returned, and because FastMCP
+          calls sync tools directly on the event loop: a blocking query there would stall every other request.
+    """
+    async def query_db(ctx: Context[ServerSession, AppContext]) -> str:
+        """Query the database using the lifespan context."""    
+        app = lifespan.app_context(ctx)
+        await app.ready.wait()
+        async with app.pool.acquire() as db:
+            return await db.query()
+
+    # Pass lifespan and tools to server
+    """
+    Key concepts:
+        - This effectively says: 
+            "Every time you start the server, enter this AppLifespan to set up resources, and offer the query_db tool."
+    """
+    mcp = FastMCP(
+        name,
+        lifespan=lifespan,
+        tools=[
+            Tool(
+                fn=query_db,
+                name="query_db",
+                title=None,
+                description="Query the database using the lifespan context.",
+                parameters=QUERY_DB_PARAMETERS,
+                fn_metadata=QUERY_DB_METADATA,
+                is_async=True,
+                context_kwarg="ctx",
+                annotations=None,
+            )
+        ],
+    )
+
+    return mcp
+
+
+def run_on_fast_event_loop(server: FastMCP) -> None:
+    """
+    Run the server over stdio on a libuv-based event loop when one is installed (uvloop on Linux/macOS, winloop on
+    Windows), otherwise on stdlib asyncio.
+
+    - The loop is handed to anyio for this one run only, so importing this module never changes the event loop used by
+      the rest of the process.
+    """
+    loop_module = "winloop" if sys.platform == "win32" else "uvloop"
+    backend_options: dict[str, Any] = {}
+    if importlib.util.find_spec(loop_module) is not None:
+        backend_options["loop_factory"] = importlib.import_module(loop_module).new_event_loop
+    anyio.run(server.run_stdio_async, backend_options=backend_options)
+
+
+mcp = build_mcp()
+
+
+if __name__ == "__main__":
+    run_on_fast_event_loop(mcp)
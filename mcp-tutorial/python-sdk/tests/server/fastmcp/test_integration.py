@@ -28,6 +28,7 @@ from examples.snippets.servers import (
     completion,
     elicitation,
     fastmcp_quickstart,
+    lifespan_example,
     notifications,
     sampling,
     structured_output,
@@ -36,6 +37,7 @@ from examples.snippets.servers import (
 from mcp.client.session import ClientSession
 from mcp.client.sse import sse_client
 from mcp.client.streamable_http import GetSessionIdCallback, streamablehttp_client
+from mcp.server.fastmcp.tools import Tool
 from mcp.shared.context import RequestContext
 from mcp.shared.message import SessionMessage
 from mcp.shared.session import RequestResponder
@@ -697,3 +699,17 @@ async def test_structured_output(server_transport: str, server_url: str) -> None
             assert "sunny" in result_text  # condition
             assert "45" in result_text  # humidity
             assert "5.2" in result_text  # wind_speed
+
+
+def test_lifespan_example_prebuilt_tool_matches_generated() -> None:
+    """Test that the lifespan example's hand-written query_db metadata matches what the SDK generates."""
+    prebuilt = lifespan_example.mcp._tool_manager.get_tool("query_db")
+    assert prebuilt is not None
+    generated = Tool.from_function(prebuilt.fn)
+
+    assert prebuilt.parameters == generated.parameters
+    assert prebuilt.context_kwarg == generated.context_kwarg
+    assert prebuilt.is_async == generated.is_async
+    assert prebuilt.fn_metadata.output_schema == generated.fn_metadata.output_schema
+    assert prebuilt.fn_metadata.wrap_output == generated.fn_metadata.wrap_output
+    assert prebuilt.fn_metadata.arg_model.model_fields.keys() == generated.fn_metadata.arg_model.model_fields.keys()